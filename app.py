@@ -1,21 +1,162 @@
 """Dash App to Allow Interactivity with NAPLAN Data."""
 
-from typing import List, Optional
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Union
 
 import dash_bootstrap_components as dbc
+import numpy as np
 import pandas as pd
 import plotly.express as px
-from dash import Dash, Input, Output, callback, dcc, html
+import plotly.io as pio
+from dash import (
+    Dash,
+    Input,
+    Output,
+    Patch,
+    State,
+    callback,
+    clientside_callback,
+    dcc,
+    html,
+)
 from dash_bootstrap_templates import load_figure_template
+from flask_caching import Cache
 from plotly import graph_objs as go
+from plotly.subplots import make_subplots
 
 load_figure_template("bootstrap")
 
+# Dash serialises figures through plotly.io, so this moves it onto orjson
+pio.json.config.default_engine = "orjson"
+
 BASE_PATH = "data"
 
-enrolments_df = pd.read_csv(f"{BASE_PATH}/enrolments.csv")
-naplan_results_df = pd.read_csv(f"{BASE_PATH}/naplan_results.csv")
-recurrent_income_df = pd.read_csv(f"{BASE_PATH}/recurrent_income.csv")
+# Only the columns the callbacks use are loaded, at the narrowest dtype that
+# holds them. Filter keys are categories so they compare on integer codes.
+NAPLAN_RESULTS_DTYPES = {
+    "school_name": "category",
+    "domain": "category",
+    "results_year": "int16",
+    "year_level": "category",
+    "avg": "float32",
+}
+RECURRENT_INCOME_DTYPES = {
+    "school_name": "category",
+    "Net recurrent income": "category",
+    "year": "int16",
+    "$ per student": "float32",
+}
+
+# Feather files are generated from the raw CSVs by `convert.py`
+naplan_results_df = pd.read_feather(
+    f"{BASE_PATH}/naplan_results.feather", columns=list(NAPLAN_RESULTS_DTYPES)
+).astype(NAPLAN_RESULTS_DTYPES)
+recurrent_income_df = pd.read_feather(
+    f"{BASE_PATH}/recurrent_income.feather", columns=list(RECURRENT_INCOME_DTYPES)
+).astype(RECURRENT_INCOME_DTYPES)
+
+# Dropdown options, computed once rather than on every layout build
+SCHOOL_NAMES = naplan_results_df["school_name"].cat.categories.tolist()
+DOMAINS = naplan_results_df["domain"].cat.categories.tolist()
+YEARS = naplan_results_df["results_year"].astype("category").cat.categories.tolist()
+YEAR_LEVELS = naplan_results_df["year_level"].cat.categories.tolist()
+INCOME_SCHOOLS = recurrent_income_df["school_name"].cat.categories.tolist()
+
+INCOME_FIELDS = [
+    "Australian government recurrent funding",
+    "State / territory government recurring funding",
+    "Fees, charges and parent contributions",
+    "Other private sources",
+    # "Total gross income",
+]
+
+
+def _group_mean(df: pd.DataFrame, keys: List[str], value: str) -> pd.Series:
+    # Sum into a dense array addressed by the flattened key codes, so the mean
+    # is two bincount passes instead of a hash groupby over the key tuples
+    key_columns = [df[key].astype("category").cat for key in keys]
+    shape = tuple(len(column.categories) for column in key_columns)
+    values = df[value].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    flat_index = np.ravel_multi_index(
+        [column.codes.to_numpy()[valid] for column in key_columns], shape
+    )
+    sums = np.bincount(flat_index, weights=values[valid], minlength=np.prod(shape))
+    counts = np.bincount(flat_index, minlength=np.prod(shape))
+    observed = counts > 0
+    index = pd.MultiIndex.from_product(
+        [column.categories for column in key_columns], names=keys
+    )
+    return pd.Series(
+        sums[observed] / counts[observed], index=index[observed], name=value
+    )
+
+
+# Per-tab precomputes are built on first use, when that tab is first opened
+
+
+@lru_cache(maxsize=None)
+def naplan_by_school_domain() -> Dict[Tuple[str, str], pd.DataFrame]:
+    # Row blocks per school and domain, so a single-domain view is one lookup
+    # per selected school rather than a filter over all rows
+    return {
+        key: df
+        for key, df in naplan_results_df.groupby(
+            ["school_name", "domain"], observed=True, sort=False
+        )
+    }
+
+
+@lru_cache(maxsize=None)
+def naplan_results_mean_all() -> pd.Series:
+    return _group_mean(
+        naplan_results_df, ["school_name", "results_year", "year_level"], "avg"
+    )
+
+
+# Choices for how many schools the top schools chart shows
+TOP_SCHOOLS_LIMITS = [10, 25, 50]
+
+
+def _rank_schools(df: pd.DataFrame) -> pd.DataFrame:
+    # Only the best schools can be shown, so select them with nlargest and
+    # sort just that subset
+    return (
+        df.groupby("school_name", observed=True, sort=False)["avg"]
+        .mean()
+        .nlargest(max(TOP_SCHOOLS_LIMITS))
+        .sort_values(ascending=True)
+        .reset_index()
+    )
+
+
+def _code_mask(column: pd.Series, labels) -> np.ndarray:
+    # Compare integer category codes rather than hashing the label strings
+    codes = column.cat.categories.get_indexer(labels)
+    return np.isin(column.cat.codes.to_numpy(), codes[codes >= 0])
+
+
+def _income_rows(
+    income_fields: List[str], school_selection: Tuple[str, ...]
+) -> pd.DataFrame:
+    mask = _code_mask(
+        recurrent_income_df["Net recurrent income"], income_fields
+    ) & _code_mask(recurrent_income_df["school_name"], school_selection)
+    return recurrent_income_df[mask]
+
+
+@lru_cache(maxsize=None)
+def top_schools_rankings() -> Dict[Union[int, str], pd.DataFrame]:
+    # Ranked school averages for every "results-year" option
+    rankings = {
+        year: _rank_schools(
+            naplan_results_df[naplan_results_df["results_year"] == year]
+        )
+        for year in YEARS
+    }
+    rankings["All"] = _rank_schools(naplan_results_df)
+    return rankings
+
 
 app = Dash(
     __name__,
@@ -24,10 +165,24 @@ app = Dash(
         {"name": "viewport", "content": "width=device-width, initial-scale=1"},
     ],
     title="NAPLAN Analysis",
+    # Tab contents, and the components their callbacks target, are only added
+    # to the layout when the tab is opened
+    suppress_callback_exceptions=True,
 )
 
 server = app.server
 
+# Figures are pure functions of the callback inputs, so memoise them per input
+cache = Cache(
+    server, config={"CACHE_TYPE": "SimpleCache", "CACHE_DEFAULT_TIMEOUT": 3600}
+)
+
+
+def _selection_key(school_selection: Optional[List[str]]) -> Tuple[str, ...]:
+    # Equivalent multi-select values share a cache entry regardless of order
+    return tuple(sorted(school_selection or ()))
+
+
 navbar = dbc.Navbar(
     dbc.Container(
         [
@@ -60,78 +215,178 @@ navbar = dbc.Navbar(
     style={"margin-bottom": 20},
 )
 
-historical_domain_performance_tab = html.Div(
-    [
-        dcc.Dropdown(
-            ["All"] + naplan_results_df["domain"].unique().tolist(),
-            value="All",
-            id="result-domain",
-        ),
-        dcc.Dropdown(
-            naplan_results_df["school_name"].unique(), multi=True, id="school-selection"
-        ),
-        dcc.Graph(id="average-naplan-results"),
-    ]
+# Axes and styling for the per-year results, with a row available for every
+# year level. Callbacks patch in the traces and titles, and lay out only the
+# rows for the year levels present, so the styling is never sent again.
+naplan_results_figure = make_subplots(
+    rows=len(YEAR_LEVELS),
+    cols=1,
+    shared_xaxes=True,
+    row_titles=YEAR_LEVELS,
+    vertical_spacing=0.1,
+)
+naplan_results_figure.update_layout(height=700, legend_title_text="school_name")
+naplan_results_figure.update_xaxes(showgrid=True, gridwidth=1, gridcolor="LightGray")
+naplan_results_figure.update_xaxes(title_text="results_year", row=len(YEAR_LEVELS))
+naplan_results_figure.update_yaxes(
+    showgrid=True, gridwidth=1, gridcolor="LightGray", matches="y"
 )
+NAPLAN_RESULTS_YAXES = [
+    axis.plotly_name for axis in naplan_results_figure.select_yaxes()
+]
+
+
+@lru_cache(maxsize=None)
+def naplan_results_rows(year_levels: Tuple[str, ...]) -> go.Figure:
+    # Row geometry and titles for just the year levels being shown
+    return make_subplots(
+        rows=max(len(year_levels), 1),
+        cols=1,
+        shared_xaxes=True,
+        row_titles=list(year_levels) or None,
+        vertical_spacing=0.1,
+    )
 
-top_schools_tab = html.Div(
-    [
-        dbc.Row(
-            [
-                dbc.Col(
-                    dcc.Dropdown(
+
+# Tabs are re-rendered each time they are opened, so the selections are
+# persisted in memory to survive switching between them
+persist = {"persistence": True, "persistence_type": "memory"}
+
+
+@lru_cache(maxsize=None)
+def historical_domain_performance_tab() -> html.Div:
+    return html.Div(
+        [
+            dcc.Dropdown(
+                ["All"] + DOMAINS,
+                value="All",
+                id="result-domain",
+                **persist,
+            ),
+            dcc.Dropdown(
+                SCHOOL_NAMES,
+                multi=True,
+                id="school-selection",
+                **persist,
+            ),
+            dcc.Loading(
+                dcc.Graph(id="average-naplan-results", figure=naplan_results_figure)
+            ),
+        ]
+    )
+
+
+@lru_cache(maxsize=None)
+def top_schools_tab() -> html.Div:
+    # Everything the browser needs to draw the top schools chart for any year
+    top_schools_data = {
+        "layout": go.Figure(
+            layout={
+                "title": "Top Schools by Average NAPLAN Results",
+                "height": 700,
+                "xaxis_title": "avg",
+                "yaxis_title": "school_name",
+            }
+        ).to_plotly_json()["layout"],
+        "rankings": {
+            str(year): {
+                "school_name": ranked_df["school_name"].to_numpy(),
+                "avg": ranked_df["avg"].to_numpy(),
+            }
+            for year, ranked_df in top_schools_rankings().items()
+        },
+    }
+
+    return html.Div(
+        [
+            dbc.Row(
+                [
+                    dbc.Col(
+                        dcc.Dropdown(
+                            [
+                                "All",
+                                "Reading",
+                                "Writing",
+                                "Spelling",
+                                "Grammar",
+                                "Numeracy",
+                            ],
+                            value="All",
+                            id="top-n-skill-selection",
+                            **persist,
+                        ),
+                        width=5,
+                    ),
+                    dbc.Col(
                         [
-                            "All",
-                            "Reading",
-                            "Writing",
-                            "Spelling",
-                            "Grammar",
-                            "Numeracy",
+                            html.Label("Schools shown", htmlFor="top-n-schools"),
+                            dcc.Dropdown(
+                                TOP_SCHOOLS_LIMITS,
+                                value=max(TOP_SCHOOLS_LIMITS),
+                                clearable=False,
+                                placeholder="Schools shown",
+                                id="top-n-schools",
+                                **persist,
+                            ),
                         ],
+                        width=5,
+                    ),
+                ],
+                justify="around",
+                style={"margin-top": 20},
+            ),
+            dbc.Row(
+                [
+                    dcc.Dropdown(
+                        ["All"] + YEARS,
                         value="All",
-                        id="top-n-skill-selection",
+                        id="results-year",
+                        **persist,
                     ),
-                    width=5,
-                ),
-                dbc.Col(width=5),
-            ],
-            justify="around",
-            style={"margin-top": 20},
-        ),
-        dbc.Row(
-            [
-                dcc.Dropdown(
-                    ["All"] + naplan_results_df["results_year"].unique().tolist(),
-                    value="All",
-                    id="results-year",
-                ),
-                dcc.Graph(id="top-schools"),
-            ]
-        ),
-    ]
-)
+                    dcc.Graph(id="top-schools"),
+                    dcc.Store(id="top-schools-data", data=top_schools_data),
+                ]
+            ),
+        ]
+    )
 
-income_distribution_tab = html.Div(
-    [
-        dcc.Dropdown(
-            recurrent_income_df["school_name"].unique(),
-            multi=True,
-            id="income-distribution-school-selection",
-        ),
-        dcc.Graph(id="income-distribution"),
-    ]
-)
 
-recurrent_income_tab = html.Div(
-    [
-        dcc.Dropdown(
-            recurrent_income_df["school_name"].unique(),
-            multi=True,
-            id="recurrent-income-school-selection",
-        ),
-        dcc.Graph(id="recurrent-income"),
-    ]
-)
+@lru_cache(maxsize=None)
+def income_distribution_tab() -> html.Div:
+    return html.Div(
+        [
+            dcc.Dropdown(
+                INCOME_SCHOOLS,
+                multi=True,
+                id="income-distribution-school-selection",
+                **persist,
+            ),
+            dcc.Graph(id="income-distribution"),
+        ]
+    )
+
+
+@lru_cache(maxsize=None)
+def recurrent_income_tab() -> html.Div:
+    return html.Div(
+        [
+            dcc.Dropdown(
+                INCOME_SCHOOLS,
+                multi=True,
+                id="recurrent-income-school-selection",
+                **persist,
+            ),
+            dcc.Graph(id="recurrent-income"),
+        ]
+    )
+
+
+TABS = {
+    "historical-naplan_results": historical_domain_performance_tab,
+    "top-schools": top_schools_tab,
+    "recurrent-income": recurrent_income_tab,
+    "income-distribution": income_distribution_tab,
+}
 
 app.layout = dbc.Container(
     [
@@ -139,21 +394,12 @@ app.layout = dbc.Container(
         dbc.Tabs(
             [
                 dbc.Tab(
-                    historical_domain_performance_tab,
                     label="Historical NAPLAN Results",
                     tab_id="historical-naplan_results",
                 ),
-                dbc.Tab(top_schools_tab, label="Top Schools", tab_id="top-schools"),
-                dbc.Tab(
-                    recurrent_income_tab,
-                    label="Recurrent Income",
-                    tab_id="recurrent-income",
-                ),
-                dbc.Tab(
-                    income_distribution_tab,
-                    label="Income Distribution",
-                    tab_id="income-distribution",
-                ),
+                dbc.Tab(label="Top Schools", tab_id="top-schools"),
+                dbc.Tab(label="Recurrent Income", tab_id="recurrent-income"),
+                dbc.Tab(label="Income Distribution", tab_id="income-distribution"),
             ],
             id="tabs",
             active_tab="historical-naplan_results",
@@ -163,46 +409,77 @@ app.layout = dbc.Container(
 )
 
 
+@callback(Output("tab-content", "children"), Input("tabs", "active_tab"))
+def render_tab_content(active_tab: str) -> html.Div:
+    return TABS[active_tab]()
+
+
+def preload() -> None:
+    """Build every lazily computed tab layout and lookup up front.
+
+    Called from the gunicorn master before it forks, so workers share these
+    read-only structures copy-on-write rather than each building their own.
+    """
+    for build_tab in TABS.values():
+        build_tab()
+    naplan_by_school_domain()
+    naplan_results_mean_all()
+
+
 @callback(
     Output("income-distribution", "figure"),
     Input("income-distribution-school-selection", "value"),
 )
 def update_income_distribution(school_selection: Optional[List[str]]) -> go.Figure:
+    return income_distribution_figure(_selection_key(school_selection))
 
-    if school_selection is None:
-        school_selection = []
-
-    income_fields = [
-        "Australian government recurrent funding",
-        "State / territory government recurring funding",
-        "Fees, charges and parent contributions",
-        "Other private sources",
-        # "Total gross income",
-    ]
 
-    plot_df = recurrent_income_df[
-        (recurrent_income_df["Net recurrent income"].isin(income_fields))
-        & (recurrent_income_df["school_name"].isin(school_selection))
-    ]
+@cache.memoize()
+def income_distribution_figure(school_selection: Tuple[str, ...]) -> go.Figure:
+    plot_df = _income_rows(INCOME_FIELDS, school_selection)
 
     colordict = {
-        f: px.colors.qualitative.Plotly[i] for i, f in enumerate(income_fields)
+        f: px.colors.qualitative.Plotly[i] for i, f in enumerate(INCOME_FIELDS)
     }
 
-    fig = px.area(
-        plot_df,
-        x="year",
-        y="$ per student",
-        color="Net recurrent income",
-        color_discrete_map=colordict,
-        facet_col="school_name",
-        facet_col_wrap=1,
-        facet_row_spacing=0.2,
+    # One stacked-area facet per school, titled with the school name. The gap
+    # between facets is a fixed number of pixels so each facet keeps its
+    # share of the 300px per school however many are selected.
+    n_rows = max(len(school_selection), 1)
+    height = 300 * n_rows
+    fig = make_subplots(
+        rows=n_rows,
+        cols=1,
+        subplot_titles=school_selection,
+        vertical_spacing=60 / height,
     )
+    facet_row = {school: row for row, school in enumerate(school_selection, start=1)}
+    in_legend = set()
+    for (school, field), group_df in plot_df.groupby(
+        ["school_name", "Net recurrent income"], observed=True
+    ):
+        fig.add_trace(
+            go.Scatter(
+                x=group_df["year"].to_numpy(),
+                y=group_df["$ per student"].to_numpy(),
+                mode="lines",
+                stackgroup="1",
+                name=field,
+                legendgroup=field,
+                showlegend=field not in in_legend,
+                line_color=colordict[field],
+            ),
+            row=facet_row[school],
+            col=1,
+        )
+        in_legend.add(field)
 
-    # Increase spacing between facets
-    fig.update_layout(height=max(300 * len(school_selection), 300))
-    fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
+    fig.update_layout(
+        height=height,
+        legend_title_text="Net recurrent income",
+    )
+    fig.update_xaxes(title_text="year", row=n_rows, col=1)
+    fig.update_yaxes(title_text="$ per student")
 
     return fig
 
@@ -212,30 +489,36 @@ def update_income_distribution(school_selection: Optional[List[str]]) -> go.Figu
     Input("recurrent-income-school-selection", "value"),
 )
 def update_recurrent_income(school_selection: Optional[List[str]]) -> go.Figure:
+    return recurrent_income_figure(_selection_key(school_selection))
+
 
-    if school_selection is None:
-        school_selection = []
+@cache.memoize()
+def recurrent_income_figure(school_selection: Tuple[str, ...]) -> go.Figure:
 
     income_fields = [
         "Total gross income",
     ]
 
-    plot_df = recurrent_income_df[
-        (recurrent_income_df["Net recurrent income"].isin(income_fields))
-        & (recurrent_income_df["school_name"].isin(school_selection))
-    ]
+    plot_df = _income_rows(income_fields, school_selection)
+
+    fig = go.Figure()
+    for school, school_df in plot_df.groupby("school_name", observed=True, sort=False):
+        fig.add_trace(
+            go.Scatter(
+                x=school_df["year"].to_numpy(),
+                y=school_df["$ per student"].to_numpy(),
+                mode="lines",
+                name=school,
+            )
+        )
 
-    fig = px.line(
-        plot_df,
-        x="year",
-        y="$ per student",
-        color="school_name",
+    fig.update_layout(
+        height=max(300 * len(school_selection), 300),
+        xaxis_title="year",
+        yaxis_title="$ per student",
+        legend_title_text="school_name",
     )
 
-    # Increase spacing between facets
-    fig.update_layout(height=max(300 * len(school_selection), 300))
-    fig.for_each_annotation(lambda a: a.update(text=a.text.split("=")[-1]))
-
     return fig
 
 
@@ -245,78 +528,107 @@ def update_recurrent_income(school_selection: Optional[List[str]]) -> go.Figure:
     Input("result-domain", "value"),
 )
 def update_naplan_results_per_year(school_selection, result_domain):
-    background_colour = "#e5ecf6"
-    if school_selection is None:
-        school_selection = []
-        background_colour = "white"
-
-    if result_domain == "All":
-        plot_df = (
-            naplan_results_df[naplan_results_df["school_name"].isin(school_selection)]
-            .groupby(["school_name", "results_year", "year_level"])["avg"]
-            .mean()
-            .reset_index()
-        )
-    else:
-        plot_df = naplan_results_df[
-            (naplan_results_df["school_name"].isin(school_selection))
-            & (naplan_results_df["domain"] == result_domain)
-        ]
-
-    fig_title = f"{result_domain} NAPLAN Results"
+    school_selection = _selection_key(school_selection)
     y_axis_title = "Average NAPLAN Score" if result_domain == "All" else "NAPLAN Score"
 
-    fig = px.line(
-        plot_df,
-        x="results_year",
-        y="avg",
-        color="school_name",
-        title=fig_title,
-        facet_row="year_level",
-        markers=True,
-        height=700,
-        facet_row_spacing=0.1,
-    )
-    fig.update_layout(plot_bgcolor=background_colour)
-    fig.update_xaxes(showgrid=True, gridwidth=1, gridcolor="LightGray")
-    fig.update_yaxes(
-        showgrid=True, gridwidth=1, gridcolor="LightGray", title_text=y_axis_title
+    traces, year_levels = naplan_results_per_year_traces(
+        school_selection, result_domain
     )
+    rows = naplan_results_rows(year_levels)
+    n_rows = len(rows.layout.annotations) or 1
+
+    fig = Patch()
+    fig["data"] = traces
+    fig["layout"]["title"]["text"] = f"{result_domain} NAPLAN Results"
+    fig["layout"]["plot_bgcolor"] = "#e5ecf6" if school_selection else "white"
+    fig["layout"]["annotations"] = [
+        annotation.to_plotly_json() for annotation in rows.layout.annotations
+    ]
+    # Spread the rows in use over the full height and hide the rest
+    for row, yaxis in enumerate(NAPLAN_RESULTS_YAXES, start=1):
+        xaxis = yaxis.replace("y", "x")
+        shown = row <= n_rows
+        fig["layout"][xaxis]["visible"] = shown
+        fig["layout"][yaxis]["visible"] = shown
+        if shown:
+            bottom = row == n_rows
+            fig["layout"][xaxis]["matches"] = rows.layout[xaxis].matches
+            fig["layout"][xaxis]["showticklabels"] = bottom
+            fig["layout"][xaxis]["title"]["text"] = "results_year" if bottom else None
+            fig["layout"][yaxis]["domain"] = rows.layout[yaxis].domain
+            fig["layout"][yaxis]["title"]["text"] = y_axis_title
     return fig
 
 
-@callback(Output("top-schools", "figure"), Input("results-year", "value"))
-def update_top_ranked_schools(results_year):
-    if results_year == "All":
-        plot_df = naplan_results_df.groupby(["school_name"])["avg"].mean().reset_index()
+@cache.memoize()
+def naplan_results_per_year_traces(
+    school_selection: Tuple[str, ...], result_domain: str
+) -> Tuple[List[go.Scatter], Tuple[str, ...]]:
+    if result_domain == "All":
+        plot_df = naplan_results_mean_all().loc[list(school_selection)].reset_index()
     else:
-        plot_df = (
-            naplan_results_df[naplan_results_df["results_year"] == results_year]
-            .groupby(["school_name", "results_year"])["avg"]
-            .mean()
-            .reset_index()
+        blocks = naplan_by_school_domain()
+        keys = [(school, result_domain) for school in school_selection]
+        plot_df = pd.concat(
+            [naplan_results_df.iloc[:0]]
+            + [blocks[key] for key in keys if key in blocks]
         )
 
-    plot_df = plot_df.sort_values(ascending=True, by="avg")
-
-    fig_title = "Top Schools by Average NAPLAN Results"
-
-    fig = px.bar(
-        plot_df,
-        y="school_name",
-        x="avg",
-        # color="School Sector",
-        orientation="h",
-        # hover_data=[
-        #     "School Sector",
-        #     "School Type",
-        # ],
-        # color_discrete_map=color_discrete_map,
-        title=fig_title,
-        height=700,
-    )
+    # One row per year level present, in year level order
+    present = set(plot_df["year_level"])
+    year_levels = tuple(level for level in YEAR_LEVELS if level in present)
 
-    return fig
+    # Keep each school's colour and legend entry consistent across the rows
+    colorway = naplan_results_figure.layout.template.layout.colorway
+    colours = {
+        school: colorway[i % len(colorway)] for i, school in enumerate(school_selection)
+    }
+    in_legend = set()
+    traces = []
+    for (school, year_level), group_df in plot_df.groupby(
+        ["school_name", "year_level"], observed=True
+    ):
+        row = year_levels.index(year_level) + 1
+        axis_suffix = "" if row == 1 else str(row)
+        traces.append(
+            go.Scatter(
+                x=group_df["results_year"].to_numpy(),
+                y=group_df["avg"].to_numpy(),
+                mode="lines+markers",
+                name=school,
+                legendgroup=school,
+                showlegend=school not in in_legend,
+                line_color=colours[school],
+                xaxis=f"x{axis_suffix}",
+                yaxis=f"y{axis_suffix}",
+            )
+        )
+        in_legend.add(school)
+    return traces, year_levels
+
+
+clientside_callback(
+    """
+    function(results_year, top_n, data) {
+        // A cleared dropdown gives null, which ranks no schools
+        var ranking = data.rankings[results_year] || {school_name: [], avg: []};
+        // Rankings are ascending, so the best schools are at the end
+        return {
+            data: [{
+                type: "bar",
+                orientation: "h",
+                y: ranking.school_name.slice(-top_n),
+                x: ranking.avg.slice(-top_n),
+            }],
+            layout: data.layout,
+        };
+    }
+    """,
+    Output("top-schools", "figure"),
+    Input("results-year", "value"),
+    Input("top-n-schools", "value"),
+    State("top-schools-data", "data"),
+)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,21 @@
+"""Convert the raw CSV extracts into Feather files for the Dash app to load."""
+
+import pandas as pd
+
+BASE_PATH = "data"
+
+DATASETS = [
+    "naplan_results",
+    "recurrent_income",
+]
+
+
+def convert(name: str) -> None:
+    """Re-encode `data/<name>.csv` as zstd-compressed Feather."""
+    df = pd.read_csv(f"{BASE_PATH}/{name}.csv")
+    df.to_feather(f"{BASE_PATH}/{name}.feather", compression="zstd")
+
+
+if __name__ == "__main__":
+    for dataset in DATASETS:
+        convert(dataset)
@@ -0,0 +1,15 @@
+"""Gunicorn settings for serving the Dash app, e.g. `gunicorn app:server`."""
+
+import os
+
+# Import the app once in the master and fork the workers from it, so the data
+# loaded at import is shared between them copy-on-write
+preload_app = True
+workers = int(os.environ.get("WEB_CONCURRENCY", 4))
+
+
+def when_ready(server):
+    # Runs in the master after the preload and before any worker is forked
+    import app
+
+    app.preload()